@@ -12,12 +12,19 @@ Attributes
 ----------
 _nameToLevel : list of str
     The list of logging levels' names as supported by :mod:`logging`.
-_levelToColoredMessage : dict
-    Dictionary that defines a template for writing messages with colors based
-    on the name of the log level.
-    Its keys are the names of the log levels (e.g. debug and info) and its
-    values are strings that consist of ANSI escape sequences with placeholders
-    for the color code and the log message.
+_levelToNum : dict
+    Numeric values of the different log levels.
+    Its keys are the names of the log levels (e.g. DEBUG and INFO) and its
+    values are the corresponding :mod:`logging` levels (e.g.
+    :data:`logging.DEBUG`). EXCEPTION messages are logged at the ERROR level.
+_SGR : str
+    Template of the ANSI escape sequence (Select Graphic Rendition) that
+    starts a colored message, with a placeholder for the color code.
+_SGR_CRITICAL : str
+    Same as `_SGR` but for the CRITICAL log level whose messages are also
+    highlighted.
+_RESET : str
+    ANSI escape sequence that ends a colored message.
 _unixLevelToColor : dict
     Colors for the different log levels when working on the standard Unix
     terminal.
@@ -46,7 +53,9 @@ the module name or the level name).
 import copy
 import logging
 import os
+import sys
 import warnings
+import weakref
 # import xml.etree.ElementTree as E
 from logging import getLevelName, Logger, NullHandler, StreamHandler, NOTSET
 
@@ -77,17 +86,22 @@ warnings.warn = warn
 _levels = ['CRITICAL', 'FATAL', 'ERROR', 'WARN', 'WARNING', 'INFO', 'DEBUG',
            'NOTSET']
 
-# TODO: explain, incl. CRITICAL different code than other levels (highlight)
-_levelToColoredMessage = {
-    'NOTSET':       "\033[{}m{}\033[0m",
-    'DEBUG':        "\033[{}m{}\033[0m",
-    'INFO':         "\033[{}m{}\033[0m",
-    'WARNING':      "\033[{}m{}\033[0m",
-    'ERROR':        "\033[{}m{}\033[0m",
-    'EXCEPTION':    "\033[{}m{}\033[0m",
-    'CRITICAL':     "\033[7;31;{}m{}\033[0m"
+# Numeric values of the log levels, used for checking if a log level is enabled
+# before doing any work on the log message
+_levelToNum = {
+    'DEBUG':        logging.DEBUG,
+    'INFO':         logging.INFO,
+    'WARNING':      logging.WARNING,
+    'ERROR':        logging.ERROR,
+    'EXCEPTION':    logging.ERROR,
+    'CRITICAL':     logging.CRITICAL
 }
-_levelToColoredMessage['WARN'] = _levelToColoredMessage['WARNING']
+
+# ANSI escape sequences surrounding a colored message. The CRITICAL messages
+# are also highlighted (reverse video and red).
+_SGR = "\033[{}m"
+_SGR_CRITICAL = "\033[7;31;{}m"
+_RESET = "\033[0m"
 
 # Color codes for the log levels in the production environment
 _prodLevelToColorCode = {
@@ -184,10 +198,35 @@ class ColoredLogger(Logger):
         # TODO: explain both type of environments and why it is so
         self._env = "DEV" if bool(os.environ.get("PYCHARM_HOSTED")) else "PROD"
         self._level_to_color = _envToColorCodes[self._env]
+        # Prefix and suffix (ANSI escape sequences) that surround a colored
+        # message for each log level, e.g. ("\033[36m", "\033[0m") for DEBUG.
+        # They are built once here so that no template needs to be formatted
+        # when logging.
+        # NOTE: the control characters are escaped since they are inserted in
+        # an lxml tree (see _add_color_to_msg())
+        self._level_to_color_wrap = {}
+        suffix = _RESET.replace("\x1b", "\\x1b")
+        for level, color_code in self._level_to_color.items():
+            sgr = _SGR_CRITICAL if level == 'CRITICAL' else _SGR
+            prefix = sgr.format(color_code).replace("\x1b", "\\x1b")
+            self._level_to_color_wrap[level] = (prefix, suffix)
+        # Logging methods of the parent class for each log level. They are
+        # bound once here instead of calling super() on every log call.
+        self._level_to_logging_fnc = {
+            'DEBUG': super().debug,
+            'INFO': super().info,
+            'WARNING': super().warning,
+            'ERROR': super().error,
+            'EXCEPTION': super().exception,
+            'CRITICAL': super().critical
+        }
         self._removed_handlers = []
         self._disabled = False
+        # Whether a console handler's stream is a terminal, cached per handler
+        # along with the stream that was checked (see _handler_supports_color())
+        self._handler_to_isatty = weakref.WeakKeyDictionary()
 
-    def _log_with_color(self, logging_fnc, msg, level, *args, **kwargs):
+    def _log_with_color(self, msg, level, *args, **kwargs):
         """Call the specified logging function by adding color to the messages.
 
         This method calls the logger's logging method to write a message with
@@ -208,6 +247,11 @@ class ColoredLogger(Logger):
             The name of the log level, e.g. 'DEBUG' and 'INFO'.
 
         """
+        # Skip all the processing (e.g. coloring) if the message would be
+        # discarded anyway because of the log level
+        if not self.isEnabledFor(_levelToNum[level]):
+            return
+        logging_fnc = self._level_to_logging_fnc[level]
         msg = self._preprocess_msg(msg)
         if self._found_tags(msg):  # log msg with color
             # IMPORTANT: Only the console handler gets colored messages. The
@@ -217,39 +261,14 @@ class ColoredLogger(Logger):
             colored_msg = self._add_color_to_msg(msg, level)
             # Get the raw message without color tags
             raw_msg = self._remove_all_tags(msg)
-            # IMPORTANT: Disable the other non-console handlers when logging in
-            # the console. Hence, the color codes will not appear in the log
-            # file.
-            #
-            # Remove non-console handlers from the logger
-            self._remove_everything_but(handlers_to_keep=[StreamHandler])
-            # NOTE: it is possible that no console handlers are to be found
-            # since the user might have set the logger to log to a file only
-            # for example.
-            #
-            # Log the colored message in the console
-            if self.handlers:
-                # Call the message-logging function, e.g. logger.info()
-                logging_fnc(colored_msg, *args, **kwargs)
-            # Add the removed non-console handlers back to the logger
-            self._add_handlers_back()
-            # IMPORTANT: take type of NullHandlers ... TODO: explain
-            # isinstance(NullHandler, NullHandler) = False
-            # type(NullHandler) is NullHandler = False
-            # But
-            # isinstance(StreamHandler OBJECT, StreamHandler) = True
-            # type(StreamHandler OBJECT) is StreamHandler = True
-            # Reason: NullHandler is a class not an object
-            #
-            # Remove the console handlers and Nullhandler from the logger since
-            # we are now going to log with non-console handlers
-            self._keep_everything_but(
-                handlers_to_remove=[NullHandler, StreamHandler])
-            # Log the non-colored message with the non-console handlers
-            if self.handlers:
-                logging_fnc(raw_msg, *args, **kwargs)
-            # Add the handlers back to the logger
-            self._add_handlers_back()
+            # Only one log record is created with the raw message. The colored
+            # message is attached to the record and callHandlers() gives it to
+            # the console handlers only. Hence, the color codes will not appear
+            # in the log file.
+            extra = dict(kwargs.get('extra') or {}, _colored_msg=colored_msg)
+            kwargs['extra'] = extra
+            # Call the message-logging function, e.g. logger.info()
+            logging_fnc(raw_msg, *args, **kwargs)
         else:  # log msg without color
             # TODO: explain why we remove NullHandler. If you don't, you get
             # the following error
@@ -260,6 +279,53 @@ class ColoredLogger(Logger):
             # Add the removed handlers back to the logger
             self._add_handlers_back()
 
+    def callHandlers(self, record):
+        """Pass a log record to all relevant handlers.
+
+        This method does the same as :meth:`logging.Logger.callHandlers`
+        except that if a colored message is attached to the record (see
+        :meth:`_log_with_color`), the console handlers (i.e.
+        :class:`logging.StreamHandler`) that can display colors (see
+        :meth:`_handler_supports_color`) will log the colored message while the
+        other handlers (e.g. file handler or console handler whose output is
+        redirected) will log the raw message.
+
+        Parameters
+        ----------
+        record : logging.LogRecord
+            The log record to be handled.
+
+        """
+        colored_msg = record.__dict__.pop('_colored_msg', None)
+        if colored_msg is None:
+            super().callHandlers(record)
+            return
+        raw_msg = record.msg
+        c = self
+        found = 0
+        while c:
+            for h in c.handlers:
+                found += 1
+                if record.levelno >= h.level:
+                    if self._handler_supports_color(h):
+                        record.msg = colored_msg
+                        try:
+                            h.handle(record)
+                        finally:
+                            record.msg = raw_msg
+                    else:
+                        h.handle(record)
+            c = c.parent if c.propagate else None
+        if found == 0:
+            if logging.lastResort:
+                if record.levelno >= logging.lastResort.level:
+                    logging.lastResort.handle(record)
+            elif logging.raiseExceptions and \
+                    not self.manager.emittedNoHandlerWarning:
+                sys.stderr.write("No handlers could be found for logger "
+                                 "\"{}\"\n".format(self.name))
+                self.manager.emittedNoHandlerWarning = True
+
     def _add_handlers_back(self):
         """Add the removed handlers back to the logger.
         """
@@ -342,7 +408,7 @@ class ColoredLogger(Logger):
 
         """
         # TODO: explain
-        level_color_code = self._level_to_color[level]
+        prefix, suffix = self._level_to_color_wrap[level]
         msg = "<log>{}</log>".format(msg)
         # NOTE: Use lxml.html.fromstring() since it is more forgiving of
         # invalid HTML, e.g. <color>test </color><urllib3.connection...>
@@ -354,13 +420,11 @@ class ColoredLogger(Logger):
         # root = ET.fromstring(msg)  # With ET
         root = html.fromstring(msg)  # Wtih html
         for color_tag in root.findall("color"):
-            colored_msg = _levelToColoredMessage[level]
-            # NOTE: must escape control characters or will get a ValueError:
-            # "All strings must be XML compatible: Unicode or ASCII, no NULL
-            # bytes or control characters"
-            colored_msg = colored_msg.replace("\x1b", "\\x1b")  # With html
-            color_tag.text = colored_msg.format(level_color_code,
-                                                color_tag.text)
+            # NOTE: the prefix and suffix have their control characters
+            # escaped or we would get a ValueError: "All strings must be XML
+            # compatible: Unicode or ASCII, no NULL bytes or control
+            # characters"
+            color_tag.text = prefix + (color_tag.text or "") + suffix
         # msg = ET.tostring(root).decode()  # With ET
         msg = html.tostring(root).decode()  # With html
         # TODO: unescape() is deprecated.
@@ -393,11 +457,72 @@ class ColoredLogger(Logger):
             # message as a string
             msg = get_error_msg(msg)
         self._disabled = True if _disableColoring else self._disabled
-        if self._disabled:  # coloring disabled
+        # NOTE: no need to color the message if it can't be displayed with
+        # colors, e.g. the console output is redirected to a file
+        if self._disabled or not self._console_supports_color():
             # Remove all tags
             msg = self._remove_all_tags(msg)
         return msg
 
+    def _console_supports_color(self):
+        """Check if one of the console handlers can display colors.
+
+        The handlers of the logger and of its ancestors (as long as the log
+        records are propagated to them) are checked, i.e. the same handlers
+        that :meth:`callHandlers` gives the log records to.
+
+        Returns
+        -------
+        bool
+            True if at least one console handler can display colors.
+
+        """
+        if self._env == "DEV":
+            return True
+        c = self
+        while c:
+            for h in c.handlers:
+                if self._handler_supports_color(h):
+                    return True
+            c = c.parent if c.propagate else None
+        return False
+
+    def _handler_supports_color(self, h):
+        """Check if a handler can display colors.
+
+        Only a console handler (i.e. :class:`logging.StreamHandler`) can
+        display colors and only if its stream is a terminal. In the development
+        environment (PyCharm), the console always supports colors even though
+        its stream is not a terminal.
+
+        Whether a handler's stream is a terminal is cached and only checked
+        again if the handler's stream changes, e.g. with
+        :meth:`logging.StreamHandler.setStream`.
+
+        Parameters
+        ----------
+        h : logging.Handler
+            The handler to be checked.
+
+        Returns
+        -------
+        bool
+            True if the handler can display colors.
+
+        """
+        if type(h) is not StreamHandler:
+            return False
+        if self._env == "DEV":
+            return True
+        stream = h.stream
+        stream_and_isatty = self._handler_to_isatty.get(h)
+        if stream_and_isatty is None or stream_and_isatty[0] is not stream:
+            stream_isatty = getattr(stream, "isatty", None)
+            isatty = bool(stream_isatty and stream_isatty())
+            stream_and_isatty = (stream, isatty)
+            self._handler_to_isatty[h] = stream_and_isatty
+        return stream_and_isatty[1]
+
     @staticmethod
     def _found_tags(msg):
         """TODO
@@ -450,7 +575,7 @@ class ColoredLogger(Logger):
             The message to be logged.
 
         """
-        self._log_with_color(super().debug, msg, 'DEBUG', *args, **kwargs)
+        self._log_with_color(msg, 'DEBUG', *args, **kwargs)
 
     def info(self, msg, *args, **kwargs):
         """Log a message with the INFO log level.
@@ -463,7 +588,7 @@ class ColoredLogger(Logger):
             The message to be logged in a console and file.
 
         """
-        self._log_with_color(super().info, msg, 'INFO', *args, **kwargs)
+        self._log_with_color(msg, 'INFO', *args, **kwargs)
 
     def warning(self, msg, *args, **kwargs):
         """Log a message with the WARNING log level.
@@ -474,7 +599,7 @@ class ColoredLogger(Logger):
             The message to be logged.
 
         """
-        self._log_with_color(super().warning, msg, 'WARNING', *args, **kwargs)
+        self._log_with_color(msg, 'WARNING', *args, **kwargs)
 
     # Deprecated method
     warn = warning
@@ -491,7 +616,7 @@ class ColoredLogger(Logger):
             (see get_error_msg).
 
         """
-        self._log_with_color(super().error, msg, 'ERROR', *args, **kwargs)
+        self._log_with_color(msg, 'ERROR', *args, **kwargs)
 
     def exception(self, msg, *args, **kwargs):
         """Log a message with the EXCEPTION log level.
@@ -504,7 +629,7 @@ class ColoredLogger(Logger):
             ``sqlite3.IntegrityError``, which will be converted to a string
             (see get_error_msg).
         """
-        self._log_with_color(super().exception, msg, 'EXCEPTION', *args, **kwargs)
+        self._log_with_color(msg, 'EXCEPTION', *args, **kwargs)
 
     def critical(self, msg, *args, **kwargs):
         """Log a message with the EXCEPTION log level.
@@ -517,7 +642,7 @@ class ColoredLogger(Logger):
             ``sqlite3.IntegrityError``, which will be converted to a string
             (see get_error_msg).
         """
-        self._log_with_color(super().critical, msg, 'CRITICAL', *args, **kwargs)
+        self._log_with_color(msg, 'CRITICAL', *args, **kwargs)
 
     fatal = critical
 
@@ -21,16 +21,57 @@ saveutils : module that defines a class for saving webpages on disk.
 
 """
 
-import codecs
-from datetime import datetime
+from datetime import datetime, timezone
+import errno
+import gc
 import json
 import os
-import pathlib
 import platform
 import pickle
 import shlex
 import shutil
+import struct
 import subprocess
+import time
+
+# Size of the buffer (1 MiB) used when reading/writing pickle files so that
+# the many small reads/writes done by :mod:`pickle` are grouped together
+_IO_BUFFER_SIZE = 1 << 20
+
+# Magic bytes at the beginning of a pickle file compressed with Blosc. A null
+# byte is not a valid pickle opcode and thus can't start a regular pickle file.
+_BLOSC_MAGIC = b'\x00BLC'
+
+# Maximum size (64 MiB) of a frame of pickled data compressed with Blosc. Blosc
+# can't compress more than about 2 GiB (blosc.MAX_BUFFERSIZE) in one go. Thus,
+# the pickled data is split into frames which are compressed separately.
+_BLOSC_FRAME_SIZE = 1 << 26
+
+# Header before each compressed frame: its size in bytes (little-endian
+# unsigned 64-bit integer)
+_BLOSC_FRAME_HEADER = struct.Struct('<Q')
+
+
+def _import_blosc():
+    """Import the module :mod:`blosc`.
+
+    Returns
+    -------
+    module
+        The module :mod:`blosc`.
+
+    Raises
+    ------
+    ImportError
+        Raised if the module :mod:`blosc` is not found.
+
+    """
+    try:
+        import blosc
+    except ImportError:
+        raise ImportError("blosc not found. You can install it with: pip "
+                          "install blosc")
+    return blosc
 
 
 def convert_utctime_to_local_tz(utc_time=None):
@@ -43,12 +84,8 @@ def convert_utctime_to_local_tz(utc_time=None):
     The date and time are returned as a string with format
     ``YYYY-MM-DD HH:MM:SS-HH:MM``
 
-    The modules :mod:`pytz` and :mod:`tzlocal` need to be installed. You can
-    install them with ``pip``::
-
-        $ pip install tzlocal
-
-    This will also install :mod:`pytz`.
+    The local time zone is the system's time zone as given by
+    :meth:`datetime.datetime.astimezone`.
 
     Parameters
     ----------
@@ -63,11 +100,6 @@ def convert_utctime_to_local_tz(utc_time=None):
         The UTC time converted into the local time zone with the format
         ``YYYY-MM-DD HH:MM:SS-HH:MM``
 
-    Raises
-    ------
-    ImportError
-        Raised if the modules :mod:`tzlocal` and :mod:`pytz` are not found.
-
     Examples
     --------
     >>> import time
@@ -76,34 +108,18 @@ def convert_utctime_to_local_tz(utc_time=None):
     '2019-09-05 18:17:59-04:00'
 
     """
-    try:
-        import pytz
-        import tzlocal
-    except ImportError as e:
-        raise ImportError("tzlocal and pytz not found. You can install them "
-                          "with: pip install tzlocal. This will also install "
-                          "pytz.")
+    if utc_time:
+        # Convert time.struct_time into a time zone aware datetime
+        # Only the date and time up to seconds, e.g. (2019, 9, 5, 22, 12, 33)
+        utc_time = datetime(*utc_time[:6], tzinfo=timezone.utc)
+        # Convert the UTC time into the local time zone
+        local_time = utc_time.astimezone()
     else:
-        # Get the local timezone name
-        tz = pytz.timezone(tzlocal.get_localzone().zone)
-        if utc_time:
-            # Convert time.struct_time into datetime
-            # Only the date and time up to seconds, e.g. (2019, 9, 5, 22, 12, 33)
-            utc_time = datetime(*utc_time[:6])
-            # Convert time zone unaware ``datetime`` object into aware timezone
-            # datetime object
-            utc_time = utc_time.replace(tzinfo=pytz.UTC)
-            # Convert the UTC time into the local time zone
-            local_time = utc_time.astimezone(tz)
-        else:
-            # Get the time in the system's time zone
-            local_time = datetime.now(tz)
-            # Remove microseconds
-            local_time = local_time.replace(microsecond=0)
-        # Use date format: YYYY-MM-DD HH:MM:SS-HH:MM
-        # ISO format is YYYY-MM-DDTHH:MM:SS-HH:MM
-        local_time = local_time.isoformat().replace("T", " ")
-        return local_time
+        # Get the time in the system's time zone and remove microseconds
+        local_time = datetime.now().astimezone().replace(microsecond=0)
+    # Use date format: YYYY-MM-DD HH:MM:SS-HH:MM
+    # ISO format is YYYY-MM-DDTHH:MM:SS-HH:MM
+    return local_time.isoformat(sep=" ")
 
 
 def create_dir(dirpath, overwrite=False):
@@ -136,14 +152,8 @@ def create_dir(dirpath, overwrite=False):
         denied (stackoverflow)`_)
 
     """
-    try:
-        pathlib.Path(dirpath).mkdir(parents=True, exist_ok=overwrite)
-    except FileExistsError:
-        raise
-    except PermissionError:
-        raise
-    else:
-        return dirpath
+    os.makedirs(dirpath, exist_ok=overwrite)
+    return dirpath
 
 
 def create_timestamped_dir(parent_dirpath, suffix=""):
@@ -176,19 +186,19 @@ def create_timestamped_dir(parent_dirpath, suffix=""):
     PermissionError
         Raised if trying to run an operation without the adequate access rights.
 
+    Notes
+    -----
+    The timestamp is based on the local time. Thus, around a DST transition,
+    two calls an hour apart can generate the same timestamp.
+
     """
     new_dirname = "-{}".format(suffix) if suffix else suffix
-    timestamped = datetime.now().strftime('%Y%m%d-%H%M%S{dirname}')
-    new_dirpath = os.path.join(
-        parent_dirpath, timestamped.format(dirname=new_dirname))
-    try:
-        pathlib.Path(new_dirpath).mkdir(parents=True, exist_ok=False)
-    except FileExistsError:
-        raise
-    except PermissionError:
-        raise
-    else:
-        return new_dirpath
+    # NOTE: the timestamp is built from the local time directly as a
+    # time.struct_time (no datetime object needed)
+    timestamp = time.strftime('%Y%m%d-%H%M%S')
+    new_dirpath = os.path.join(parent_dirpath, timestamp + new_dirname)
+    os.makedirs(new_dirpath)
+    return new_dirpath
 
 
 def delete_folder_contents(folderpath, remove_subdirs=True, delete_recursively=False):
@@ -237,37 +247,71 @@ def delete_folder_contents(folderpath, remove_subdirs=True, delete_recursively=F
                 for d in dirs:
                     shutil.rmtree(os.path.join(root, d))
 
-    try:
-        if delete_recursively:
-            remove_recursively()
-        else:
-            remove_non_recursively()
-    except OSError:
-        raise
+    if delete_recursively:
+        remove_recursively()
+    else:
+        remove_non_recursively()
 
 
-def dump_pickle(filepath, data):
+def dump_pickle(filepath, data, protocol=pickle.HIGHEST_PROTOCOL,
+                compress=False):
     """Write data to a pickle file.
 
+    The pickled data can also be compressed with Blosc (Zstandard codec with
+    the shuffle filter) which is useful for large numeric payloads (e.g. NumPy
+    arrays) where writing to disk is slower than compressing. The module
+    :mod:`blosc` needs then to be installed. It can be installed with
+    ``pip``::
+
+        $ pip install blosc
+
     Parameters
     ----------
     filepath: str
         Path to the pickle file where data will be written.
     data:
         Data to be saved on disk.
+    protocol: int, optional
+        Pickle protocol to be used (the default value is
+        :data:`pickle.HIGHEST_PROTOCOL` which implies that the highest protocol
+        version available will be used).
+    compress: bool, optional
+        Whether the pickled data is compressed with Blosc (the default value is
+        False which implies that the data is saved as a regular pickle file).
 
     Raises
     ------
+    ImportError
+        Raised if `compress` is True and the module :mod:`blosc` is not found.
     OSError
         Raised if any I/O related occurs while writing the data to disk, e.g.
         the file doesn't exist.
 
+    Notes
+    -----
+    A compressed pickle file starts with magic bytes so that
+    :meth:`load_pickle` can detect it and decompress it automatically.
+
+    Since Blosc can't compress more than about 2 GiB in one go, the pickled
+    data is split into frames of at most 64 MiB which are compressed
+    separately. Each compressed frame is preceded by its size. The pickled
+    data is still built in memory before being compressed.
+
     """
-    try:
+    if compress:
+        blosc = _import_blosc()
+        pickled = memoryview(pickle.dumps(data, protocol=protocol))
         with open(filepath, 'wb') as f:
-            pickle.dump(data, f)
-    except OSError:
-        raise
+            f.write(_BLOSC_MAGIC)
+            for start in range(0, len(pickled), _BLOSC_FRAME_SIZE):
+                frame = blosc.compress(
+                    pickled[start:start + _BLOSC_FRAME_SIZE], typesize=8,
+                    clevel=3, shuffle=blosc.SHUFFLE, cname='zstd')
+                f.write(_BLOSC_FRAME_HEADER.pack(len(frame)))
+                f.write(frame)
+    else:
+        with open(filepath, 'wb', buffering=_IO_BUFFER_SIZE) as f:
+            pickle.dump(data, f, protocol=protocol)
 
 
 def dumps_json(filepath, data, encoding='utf8', sort_keys=True,
@@ -307,13 +351,10 @@ def dumps_json(filepath, data, encoding='utf8', sort_keys=True,
         the file doesn't exist.
 
     """
-    try:
-        with codecs.open(filepath, 'w', encoding) as f:
-            f.write(json.dumps(data,
-                               sort_keys=sort_keys,
-                               ensure_ascii=ensure_ascii))
-    except OSError:
-        raise
+    with open(filepath, 'w', encoding=encoding) as f:
+        f.write(json.dumps(data,
+                           sort_keys=sort_keys,
+                           ensure_ascii=ensure_ascii))
 
 
 def get_creation_date(filepath):
@@ -424,20 +465,23 @@ def load_json(filepath, encoding='utf8'):
         Raised if any I/O related error occurs while reading the file, e.g. the
         file doesn't exist.
 
+    Notes
+    -----
+    The whole file is read at once as bytes which are then decoded and parsed
+    with the :mod:`json` module.
+
     """
-    try:
-        with codecs.open(filepath, 'r', encoding) as f:
-            data = json.load(f)
-    except OSError:
-        raise
-    else:
-        return data
+    with open(filepath, 'rb') as f:
+        buf = f.read()
+    return json.loads(buf.decode(encoding))
 
 
 def load_pickle(filepath):
     """Load data from a pickle file on disk.
 
-    The function opens a pickle file and returns its content.
+    The function opens a pickle file and returns its content. If the pickle
+    file was compressed with Blosc (see :meth:`dump_pickle`), it is first
+    decompressed.
 
     Parameters
     ----------
@@ -451,18 +495,40 @@ def load_pickle(filepath):
 
     Raises
     ------
+    ImportError
+        Raised if the pickle file is compressed and the module :mod:`blosc` is
+        not found.
     OSError
         Raised if any I/O related error occurs while reading the file, e.g. the
         file doesn't exist.
 
+    Notes
+    -----
+    The cyclic garbage collector is disabled while unpickling since it would
+    otherwise be triggered repeatedly by the many small objects (e.g. tuples)
+    allocated during loading. It is re-enabled afterward if it was enabled.
+
     """
+    gc_enabled = gc.isenabled()
+    gc.disable()
     try:
-        with open(filepath, 'rb') as f:
-            data = pickle.load(f)
-    except OSError:
-        raise
-    else:
-        return data
+        with open(filepath, 'rb', buffering=_IO_BUFFER_SIZE) as f:
+            if f.peek(len(_BLOSC_MAGIC)).startswith(_BLOSC_MAGIC):
+                # Compressed pickle file
+                blosc = _import_blosc()
+                f.seek(len(_BLOSC_MAGIC))
+                # Decompress the frames one after the other
+                pickled = bytearray()
+                header = f.read(_BLOSC_FRAME_HEADER.size)
+                while header:
+                    frame_size, = _BLOSC_FRAME_HEADER.unpack(header)
+                    pickled += blosc.decompress(f.read(frame_size))
+                    header = f.read(_BLOSC_FRAME_HEADER.size)
+                return pickle.loads(pickled)
+            return pickle.load(f)
+    finally:
+        if gc_enabled:
+            gc.enable()
 
 
 def load_yaml(filepath):
@@ -500,31 +566,46 @@ def load_yaml(filepath):
     ``Loader``, as the default Loader is unsafe. You must specify a loader with
     the ``Loader=`` argument. See `PyYAML yaml.load(input) Deprecation`_.
 
+    The ``CSafeLoader`` (based on LibYAML) is used if PyYAML was built with
+    LibYAML support since parsing is then done in C. Otherwise, we fallback
+    to the pure-Python ``SafeLoader``. The file is opened in binary mode since
+    the loaders can decode the bytes themselves.
+
     """
     try:
         import yaml
     except ImportError:
         raise ImportError("yaml not found. You can install it with: pip "
                           "install pyyaml")
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
     try:
-        with open(filepath, 'r') as f:
-            return yaml.load(f, Loader=yaml.FullLoader)
+        with open(filepath, 'rb') as f:
+            return yaml.load(f, Loader=loader)
     except (OSError, yaml.YAMLError) as e:
         raise OSError(e)
 
 
-def read_file(filepath):
-    """Read a file (in text mode) from disk.
+def read_file(filepath, binary=False, encoding='utf8'):
+    """Read a file (in text or binary mode) from disk.
 
     Parameters
     ----------
     filepath : str
         Path to the file to be read from disk.
+    binary : bool, optional
+        Whether the file is read in binary mode (the default value is False
+        which implies that the file is read in text mode). In binary mode, the
+        raw bytes are returned without being decoded.
+    encoding : str, optional
+        Encoding to be used for decoding the file in text mode (the default
+        value is 'utf8' which is also the default encoding of
+        :meth:`write_file`). It is ignored in binary mode.
 
     Returns
     -------
-    str
-        Content of the file returned as strings.
+    str or bytes
+        Content of the file returned as strings, or as bytes if `binary` is
+        True.
 
     Raises
     ------
@@ -533,11 +614,11 @@ def read_file(filepath):
         file doesn't exist.
 
     """
-    try:
-        with open(filepath, 'r') as f:
+    if binary:
+        with open(filepath, 'rb') as f:
             return f.read()
-    except OSError as e:
-        raise
+    with open(filepath, 'r', encoding=encoding) as f:
+        return f.read()
 
 
 def run_cmd(cmd, stderr=subprocess.STDOUT):
@@ -581,24 +662,29 @@ def run_cmd(cmd, stderr=subprocess.STDOUT):
         result = subprocess.run(shlex.split(cmd), capture_output=True)
     except subprocess.CalledProcessError as e:
         return e
-    except FileNotFoundError:
-        raise
     else:
         return result
 
 
-def write_file(filepath, data, overwrite_file=True):
-    """Write data (text mode) to a file.
+def write_file(filepath, data, overwrite_file=True, encoding='utf8'):
+    """Write data to a file.
+
+    If `data` is a string, it is first encoded and then the resulting bytes
+    are written in one go to the file opened in binary mode. Thus, no newline
+    translation is done, e.g. ``\n`` is not converted to ``\r\n`` on Windows.
 
     Parameters
     ----------
     filepath : str
         Path to the file where the data will be written.
-    data
+    data : str or bytes
         Data to be written.
     overwrite_file : bool, optional
         Whether the file can be overwritten (the default value is True which
         implies that the file can be overwritten).
+    encoding : str, optional
+        Encoding to be used for encoding `data` if it is a string (the default
+        value is 'utf8').
 
     Raises
     ------
@@ -608,15 +694,24 @@ def write_file(filepath, data, overwrite_file=True):
     FileExistsError
         Raised if an existing file is being overwritten and the flag to overwrite
         files is disabled.
+    IsADirectoryError
+        Raised if `filepath` is a directory, whether the flag to overwrite
+        files is enabled or not.
 
     """
+    if isinstance(data, str):
+        data = data.encode(encoding)
+    # NOTE: with the 'x' mode, the file is only created if it doesn't already
+    # exist. The check is thus done atomically by the OS when opening the file.
     try:
-        if os.path.isfile(filepath) and not overwrite_file:
-            raise FileExistsError(
-                "File '{}' already exists and overwrite is False".format(
-                    filepath))
-        else:
-            with open(filepath, 'w') as f:
-                f.write(data)
-    except OSError:
-        raise
+        f = open(filepath, 'wb' if overwrite_file else 'xb')
+    except FileExistsError:
+        # NOTE: a directory is reported as such, like with the 'wb' mode
+        if os.path.isdir(filepath):
+            raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR),
+                                    filepath) from None
+        raise FileExistsError(
+            "File '{}' already exists and overwrite is False".format(
+                filepath)) from None
+    with f:
+        f.write(data)
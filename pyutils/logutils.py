@@ -40,9 +40,9 @@ def get_error_msg(exc):
         The error message converted as a string.
 
     """
-    # TODO: explain
-    error_msg = '[{}] {}'.format(exc.__class__.__name__, exc.__str__())
-    return error_msg
+    # The error message consists of the exception's class name surrounded by
+    # brackets followed by the exception's message
+    return f"[{type(exc).__name__}] {exc}"
 
 
 def setup_basic_logger(name, add_console_handler=False, add_file_handler=False,
@@ -124,6 +124,9 @@ def setup_logging_from_cfg(logging_config):
         logger(s). The contents of the logging dictionary is described in
         `Configuration dictionary schema`_.
 
+        If the log filename was updated with the date and time, this is a new
+        :obj:`dict`. The given logging :obj:`dict` is never modified.
+
     Raises
     ------
     KeyError
@@ -141,28 +144,30 @@ def setup_logging_from_cfg(logging_config):
     Logging`_.
 
     """
-    try:
-        # Check type of logging_config
-        if isinstance(logging_config, str):
-            # It is a YAML configuration file
-            config_dict = load_yaml(logging_config)
-        else:
-            # It is a logging config dictionary
-            config_dict = logging_config
-        if config_dict.get('add_datetime'):
-            # Add the datetime to the beginning of the log filename
-            # ref.: https://stackoverflow.com/a/45447081
-            filename = config_dict['handlers']['file']['filename']
-            # In case that the filename is a path, e.g. /test/debug.log
-            dirname = os.path.dirname(filename)
-            filename = os.path.basename(filename)
-            new_filename = '{:%Y-%m-%d-%H-%M-%S}-{}'.format(
-                datetime.now(), filename)
-            new_filename = os.path.join(dirname, new_filename)
-            config_dict['handlers']['file']['filename'] = new_filename
-        # Update the logging config dict with new values from config_dict
-        logging.config.dictConfig(config_dict)
-    except (KeyError, OSError, ValueError):
-        raise
-    else:  # No error
-        return config_dict
+    # Check type of logging_config
+    if isinstance(logging_config, str):
+        # It is a YAML configuration file
+        config_dict = load_yaml(logging_config)
+    else:
+        # It is a logging config dictionary
+        config_dict = logging_config
+    if config_dict.get('add_datetime'):
+        # Add the datetime to the beginning of the log filename
+        # ref.: https://stackoverflow.com/a/45447081
+        filename = config_dict['handlers']['file']['filename']
+        # In case that the filename is a path, e.g. /test/debug.log
+        dirname = os.path.dirname(filename)
+        filename = os.path.basename(filename)
+        new_filename = '{:%Y-%m-%d-%H-%M-%S}-{}'.format(
+            datetime.now(), filename)
+        new_filename = os.path.join(dirname, new_filename)
+        # NOTE: only the dicts leading to the filename are copied so that the
+        # given logging config dict is not modified
+        config_dict = dict(config_dict)
+        config_dict['handlers'] = dict(config_dict['handlers'])
+        file_handler = dict(config_dict['handlers']['file'])
+        file_handler['filename'] = new_filename
+        config_dict['handlers']['file'] = file_handler
+    # Update the logging config dict with new values from config_dict
+    logging.config.dictConfig(config_dict)
+    return config_dict
@@ -4,16 +4,42 @@
 
 """
 
+import contextlib
+import io
 import logging
 import os
 import unittest
+from unittest import mock
 
 from .utils import TestBase
+from pyutils.colored_logger import ColoredLogger
+from pyutils.genutils import read_file
 from pyutils.logutils import setup_basic_logger
 
 logging.getLogger(__name__).addHandler(logging.NullHandler)
 
 
+class _TtyStringIO(io.StringIO):
+    """In-memory text stream that pretends to be a terminal.
+    """
+
+    def isatty(self):
+        return True
+
+
+def _add_color_without_lxml(self, msg, level):
+    """Add color to the log message without using :mod:`lxml`.
+
+    Used in place of :meth:`ColoredLogger._add_color_to_msg` since
+    :mod:`lxml` might not be installed.
+
+    """
+    prefix, suffix = self._level_to_color_wrap[level]
+    prefix = prefix.replace("\\x1b", "\x1b")
+    suffix = suffix.replace("\\x1b", "\x1b")
+    return msg.replace("<color>", prefix).replace("</color>", suffix)
+
+
 class TestColoredLogging(TestBase):
     # TODO
     test_module_name = "colored_logger"
@@ -94,6 +120,122 @@ class TestColoredLogging(TestBase):
         self.logger.error("Exception message: <color>{}</color>".format(exc_msg))
         self.logger.info("All logging methods logged the expected messages")
 
+    # @unittest.skip("test_call_handlers()")
+    def test_call_handlers(self):
+        """Test that callHandlers() gives the colored message to the console
+        handler and the raw message to the file handler.
+
+        This test checks that only one log record is created for a colored
+        message, that the log record keeps the `extra` given by the caller and
+        that the colored message doesn't remain on the log record.
+
+        """
+        self.logger.warning("\n\n<color>test_call_handlers()</color>")
+        self.logger.info("Testing <color>callHandlers()</color> with a "
+                         "console and a file handler...")
+        fmt = logging.Formatter("%(user)s: %(message)s")
+        tty_stream = _TtyStringIO()
+        ch = logging.StreamHandler(tty_stream)
+        ch.setFormatter(fmt)
+        log_filepath = os.path.join(self.sandbox_tmpdir, 'test.log')
+        fh = logging.FileHandler(log_filepath)
+        fh.setFormatter(fmt)
+        with self._coloring_enabled():
+            logger = self._get_test_logger("test_call_handlers")
+            logger.addHandler(ch)
+            logger.addHandler(fh)
+            # Keep the log records created by the logger
+            records = []
+            make_record = logger.makeRecord
+
+            def keep_record(*args, **kwargs):
+                records.append(make_record(*args, **kwargs))
+                return records[-1]
+
+            with mock.patch.object(logger, 'makeRecord', keep_record):
+                logger.info("a <color>b</color>", extra={'user': 'bob'})
+        fh.close()
+        msg = "Only one log record should be created"
+        self.assertEqual(len(records), 1, msg)
+        record = records[0]
+        self.assertEqual(record.user, 'bob',
+                         "The extra given by the caller was not kept")
+        self.assertNotIn('_colored_msg', record.__dict__,
+                         "The colored message remained on the log record")
+        self.assertEqual(record.msg, "a b",
+                         "The log record doesn't have the raw message")
+        msg = "The console handler didn't log the colored message"
+        self.assertEqual(tty_stream.getvalue(),
+                         "bob: a \x1b[32mb\x1b[0m\n", msg)
+        msg = "The file handler didn't log the raw message"
+        self.assertEqual(read_file(log_filepath), "bob: a b\n", msg)
+        self.logger.info("The console and file handlers logged the expected "
+                         "messages")
+
+    # @unittest.skip("test_colored_msg_only_to_tty_handlers()")
+    def test_colored_msg_only_to_tty_handlers(self):
+        """Test that only the console handlers whose stream is a terminal log
+        colored messages.
+
+        The test logger has its own console handler writing to a terminal and
+        propagates its log records to a parent logger whose console handler
+        writes to a stream that is not a terminal.
+
+        """
+        self.logger.warning("\n\n<color>test_colored_msg_only_to_tty_handlers()"
+                            "</color>")
+        self.logger.info("Testing that only terminals get <color>colored "
+                         "messages</color>...")
+        tty_stream = _TtyStringIO()
+        plain_stream = io.StringIO()
+        with self._coloring_enabled():
+            logger = self._get_test_logger("test_colored_msg_only_to_tty")
+            logger.addHandler(logging.StreamHandler(tty_stream))
+            logger.parent = logging.Logger("test_parent")
+            logger.parent.addHandler(logging.StreamHandler(plain_stream))
+            logger.info("a <color>b</color>")
+        msg = "The console handler writing to a terminal didn't get the " \
+              "colored message: {!r}".format(tty_stream.getvalue())
+        self.assertEqual(tty_stream.getvalue(), "a \x1b[32mb\x1b[0m\n", msg)
+        msg = "The console handler not writing to a terminal got a colored " \
+              "message: {!r}".format(plain_stream.getvalue())
+        self.assertEqual(plain_stream.getvalue(), "a b\n", msg)
+        self.logger.info("Only the terminal got the colored message")
+
+    # @unittest.skip("test_console_supports_color()")
+    def test_console_supports_color(self):
+        """Test that _console_supports_color() checks the handlers of the
+        ancestors and the current stream of the handlers.
+
+        The test logger has no handler of its own and propagates its log
+        records to a parent logger whose console handler writes to a terminal
+        and then to a stream that is not a terminal.
+
+        """
+        self.logger.warning("\n\n<color>test_console_supports_color()"
+                            "</color>")
+        self.logger.info("Testing <color>_console_supports_color()"
+                         "</color>...")
+        logger = self._get_test_logger("test_console_supports_color")
+        logger.parent = logging.Logger("test_parent")
+        ch = logging.StreamHandler(_TtyStringIO())
+        logger.parent.addHandler(ch)
+        msg = "The parent's console handler writing to a terminal should " \
+              "support colors"
+        self.assertTrue(logger._console_supports_color(), msg)
+        # The cached result must not be used for the new stream
+        ch.setStream(io.StringIO())
+        msg = "The parent's console handler not writing to a terminal " \
+              "should not support colors"
+        self.assertFalse(logger._console_supports_color(), msg)
+        # The log records are not given to the parent's handlers anymore
+        ch.setStream(_TtyStringIO())
+        logger.propagate = False
+        msg = "The parent's handlers should not be checked if the log " \
+              "records are not propagated"
+        self.assertFalse(logger._console_supports_color(), msg)
+        self.logger.info("The console handlers were checked as expected")
+
     # @unittest.skip("test_found_tags()")
     def test_found_tags(self):
         """TODO
@@ -203,6 +345,47 @@ class TestColoredLogging(TestBase):
         self.assertTrue(nb_handlers == 0, msg)
         self.logger.info("The console handler was successfully removed")
 
+    @staticmethod
+    def _coloring_enabled():
+        """Enable the coloring of messages even if :mod:`lxml` is not
+        installed.
+
+        Returns
+        -------
+        contextlib.ExitStack
+            Context manager within which the messages are colored with
+            :func:`_add_color_without_lxml`.
+
+        """
+        stack = contextlib.ExitStack()
+        stack.enter_context(
+            mock.patch('pyutils.colored_logger._disableColoring', False))
+        stack.enter_context(
+            mock.patch.object(ColoredLogger, '_add_color_to_msg',
+                              _add_color_without_lxml))
+        return stack
+
+    @staticmethod
+    def _get_test_logger(name):
+        """Get a colored logger that is not registered with :mod:`logging`.
+
+        Parameters
+        ----------
+        name : str
+            Name of the test logger.
+
+        Returns
+        -------
+        logger : ColoredLogger
+            Test logger in the production environment and with the DEBUG level.
+
+        """
+        # NOTE: the environment is set when the logger is built, i.e. PROD if
+        # not in PyCharm
+        with mock.patch.dict(os.environ):
+            os.environ.pop("PYCHARM_HOSTED", None)
+            return ColoredLogger(name, logging.DEBUG)
+
 
 if __name__ == '__main__':
     unittest.main()
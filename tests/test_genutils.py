@@ -5,12 +5,16 @@ Every functions in :mod:`~pyutils.genutils` are tested here.
 """
 
 # TODO: add support for Python 3.4 and 3.5
+import calendar
 from datetime import datetime
+import importlib.util
+import math
 import os
+import struct
 import time
 import unittest
+from unittest import mock
 
-import tzlocal
 import yaml
 
 from .utils import TestBase
@@ -49,24 +53,30 @@ class TestFunctions(TestBase):
         time_tuple = (2019, 10, 4, 6, 29, 19, 5, 277, 0)
         stime = time.struct_time(time_tuple)
         output = convert_utctime_to_local_tz(stime)
-        # TODO: explain
-        local_timezone = tzlocal.get_localzone().zone
-        if local_timezone == 'UTC':
-            self.logger.warning("<color>tzlocal couldn't find any timezone "
-                                "configuration and thus defaulted to UTC"
+        # NOTE: the expected local time is computed with the time module
+        # instead of datetime which is used by convert_utctime_to_local_tz().
+        # The UTC offset is the one at the given date and time (e.g. with DST),
+        # not the current one.
+        local_time = time.localtime(calendar.timegm(stime))
+        offset_minutes = local_time.tm_gmtoff // 60
+        sign = "-" if offset_minutes < 0 else "+"
+        hours, minutes = divmod(abs(offset_minutes), 60)
+        expected = "{}{}{:02d}:{:02d}".format(
+            time.strftime("%Y-%m-%d %H:%M:%S", local_time), sign, hours,
+            minutes)
+        if not local_time.tm_gmtoff:
+            self.logger.warning("<color>The local time zone is UTC"
                                 "</color>")
-            expected = '2019-10-04 06:29:19+00:00'
             msg = "Returned local datetime {} is different than expected " \
                   "{}".format(output, expected)
             self.assertTrue(output == expected, msg)
         else:
-            self.logger.info("<color>Timezone found:</color> " + local_timezone)
-            expected = '2019-10-04 ??:29:19???:00'
-            exp1 = output[0:11] == expected[0:11]
-            exp2 = output[13:19] == expected[13:19]
+            self.logger.info("<color>Timezone found:</color> " +
+                             local_time.tm_zone)
             msg = "UTC time '{}' was incorrectly converted into the local " \
-                  "time as '{}'".format(str(datetime(*stime[:7])), output)
-            self.assertTrue(exp1 and exp2, msg)
+                  "time as '{}' instead of '{}'".format(
+                   str(datetime(*stime[:6])), output, expected)
+            self.assertTrue(output == expected, msg)
         self.logger.info("Returned local datetime as expected: "
                          "{}".format(output))
 
@@ -436,6 +446,67 @@ class TestFunctions(TestBase):
         self.assertDictEqual(data1, data2, msg)
         self.logger.info("The pickled data was saved and loaded correctly")
 
+    # @unittest.skip("test_dump_and_load_compressed_pickle()")
+    @unittest.skipUnless(importlib.util.find_spec("blosc"), "blosc not found")
+    def test_dump_and_load_compressed_pickle(self):
+        """Test that dump_pickle() dumps compressed data to a file on disk and
+        that load_pickle() decompresses and loads the data back.
+
+        This function tests that the data compressed with Blosc and saved on
+        disk is not corrupted by loading it and checking that it is the same
+        as the original data.
+
+        """
+        self.logger.warning("\n\n<color>test_dump_and_load_compressed_pickle()"
+                            "</color>")
+        self.logger.info("Testing <color>dump_pickle() and load_pickle()"
+                         "</color> with compression...")
+        data1 = {
+            'key1': list(range(1000)),
+            'key2': b'value2' * 1000
+        }
+        filepath = os.path.join(self.sandbox_tmpdir, "data.pkl")
+        dump_pickle(filepath, data1, compress=True)
+        # Test that the data was correctly written by loading it
+        data2 = load_pickle(filepath)
+        msg = "The compressed data that was saved on disk is corrupted"
+        self.assertDictEqual(data1, data2, msg)
+        self.logger.info("The compressed pickled data was saved and loaded "
+                         "correctly")
+
+    # @unittest.skip("test_dump_and_load_compressed_pickle_frames()")
+    @unittest.skipUnless(importlib.util.find_spec("blosc"), "blosc not found")
+    def test_dump_and_load_compressed_pickle_frames(self):
+        """Test that dump_pickle() splits large pickled data into several
+        compressed frames and that load_pickle() loads the data back.
+
+        The maximum size of a frame is reduced so that the data doesn't need
+        to be large to be split into several frames.
+
+        """
+        self.logger.warning("\n\n<color>test_dump_and_load_compressed_pickle_"
+                            "frames()</color>")
+        self.logger.info("Testing <color>dump_pickle() and load_pickle()"
+                         "</color> with several compressed frames...")
+        data1 = {
+            'key1': list(range(1000)),
+            'key2': b'value2' * 1000
+        }
+        filepath = os.path.join(self.sandbox_tmpdir, "data.pkl")
+        with mock.patch('pyutils.genutils._BLOSC_FRAME_SIZE', 1000):
+            dump_pickle(filepath, data1, compress=True)
+        # The first frame's size is right after the magic bytes
+        data = read_file(filepath, binary=True)
+        frame_size, = struct.unpack('<Q', data[4:12])
+        msg = "The compressed data was not split into several frames"
+        self.assertLess(frame_size + 12, len(data), msg)
+        # Test that the data was correctly written by loading it
+        data2 = load_pickle(filepath)
+        msg = "The compressed data that was saved on disk is corrupted"
+        self.assertDictEqual(data1, data2, msg)
+        self.logger.info("The compressed pickled data was saved in several "
+                         "frames and loaded correctly")
+
     # @unittest.skip("test_dumps_and_load_json_case_1()")
     def test_dumps_and_load_json_case_1(self):
         """Test that dumps_json() dumps JSON data to a file on disk and that
@@ -514,6 +585,52 @@ class TestFunctions(TestBase):
         self.logger.info("The JSON data was saved and loaded correctly with "
                          "its keys not sorted")
 
+    # @unittest.skip("test_dumps_json_nan_and_big_int()")
+    def test_dumps_json_nan_and_big_int(self):
+        """Test that dumps_json() writes NaN and integers that don't fit in 64
+        bits as is.
+
+        This test consists in checking that :meth:`~pyutils.genutils.dumps_json`
+        doesn't lose any data when it is given NaN or an integer that doesn't
+        fit in 64 bits, and that the file is written with the same layout as
+        :meth:`json.dumps`.
+
+        """
+        self.logger.warning("\n\n<color>test_dumps_json_nan_and_big_int()"
+                            "</color>")
+        self.logger.info("Testing <color>dumps_json()</color> with NaN and "
+                         "a big integer...")
+        data = {'big': 2**70, 'nan': float('nan')}
+        filepath = os.path.join(self.sandbox_tmpdir, "data.json")
+        dumps_json(filepath, data)
+        msg = "The JSON data written on disk is not the expected one"
+        self.assertEqual(read_file(filepath),
+                         '{"big": 1180591620717411303424, "nan": NaN}', msg)
+        self.logger.info("The JSON data was written correctly")
+
+    # @unittest.skip("test_load_json_nan_and_big_int()")
+    def test_load_json_nan_and_big_int(self):
+        """Test that load_json() loads NaN and integers that don't fit in 64
+        bits as is.
+
+        This test consists in checking that :meth:`~pyutils.genutils.load_json`
+        loads NaN as a float NaN and an integer that doesn't fit in 64 bits as
+        the exact integer, i.e. without any loss of precision.
+
+        """
+        self.logger.warning("\n\n<color>test_load_json_nan_and_big_int()"
+                            "</color>")
+        self.logger.info("Testing <color>load_json()</color> with NaN and "
+                         "a big integer...")
+        filepath = os.path.join(self.sandbox_tmpdir, "data.json")
+        write_file(filepath, '{"big": 1180591620717411303424, "nan": NaN}')
+        data = load_json(filepath)
+        msg = "The JSON data loaded from disk is not the expected one"
+        self.assertEqual(data['big'], 2**70, msg)
+        self.assertIsInstance(data['big'], int, msg)
+        self.assertTrue(math.isnan(data['nan']), msg)
+        self.logger.info("The JSON data was loaded correctly")
+
     # @unittest.skip("test_get_creation_date()")
     def test_get_creation_date(self):
         """Test that get_creation_date() returns a valid creation date for a
@@ -588,6 +705,29 @@ class TestFunctions(TestBase):
         self.logger.info("<color>Raised an OSError exception as expected:"
                          "</color> {}".format(get_error_msg(cm.exception)))
 
+    # @unittest.skip("test_read_file_binary()")
+    def test_read_file_binary(self):
+        """Test that read_file() returns the raw bytes of a file when
+        `binary` is True.
+
+        This test consists in checking that
+        :meth:`~pyutils.genutils.read_file()` returns the content of a file as
+        bytes without decoding it when the flag `binary` is set to True.
+
+        """
+        self.logger.warning("\n\n<color>test_read_file_binary()</color>")
+        self.logger.info("Testing <color>read_file()</color> in binary "
+                         "mode...")
+        # Write text to a file on disk
+        text = "Hello World!\n"
+        filepath = os.path.join(self.sandbox_tmpdir, "file.txt")
+        write_file(filepath, text)
+        # Test that the text was read back as bytes
+        data = read_file(filepath, binary=True)
+        msg = "The bytes read from disk are not the expected ones"
+        self.assertEqual(data, text.encode(), msg)
+        self.logger.info("The file was read in binary mode correctly")
+
     # @unittest.skip("test_run_cmd_date()")
     def test_run_cmd_date(self):
         """Test run_cmd() with the command ``date``
@@ -639,6 +779,60 @@ class TestFunctions(TestBase):
         self.assertTrue(text1 == text2, msg)
         self.logger.info("The text was saved and read correctly")
 
+    # @unittest.skip("test_write_and_read_file_non_ascii()")
+    def test_write_and_read_file_non_ascii(self):
+        """Test that write_file() and read_file() round-trip non-ASCII text.
+
+        This test consists in checking that text with non-ASCII characters
+        written by :meth:`~pyutils.genutils.write_file` is read back unchanged
+        by :meth:`~pyutils.genutils.read_file`, whatever the locale's default
+        encoding is, since both default to UTF-8.
+
+        """
+        self.logger.warning("\n\n<color>test_write_and_read_file_non_ascii()"
+                            "</color>")
+        self.logger.info("Testing <color>write_file() and read_file()"
+                         "</color> with non-ASCII text...")
+        text1 = "Héllo Wörld! \u00e9\u4e16\u754c\n"
+        filepath = os.path.join(self.sandbox_tmpdir, "file.txt")
+        write_file(filepath, text1)
+        msg = "The non-ASCII text that was saved on disk is corrupted"
+        self.assertEqual(read_file(filepath), text1, msg)
+        self.assertEqual(read_file(filepath, binary=True),
+                         text1.encode('utf8'), msg)
+        self.logger.info("The non-ASCII text was saved and read correctly")
+
+    # @unittest.skip("test_write_file_no_overwrite()")
+    def test_write_file_no_overwrite(self):
+        """Test write_file() when a file already exists and must not be
+        overwritten.
+
+        This test consists in checking that
+        :meth:`~pyutils.genutils.write_file()` raises a :exc:`FileExistsError`
+        exception when a file already exists and `overwrite_file` is False, and
+        that the file is left untouched.
+
+        """
+        self.logger.warning("\n\n<color>test_write_file_no_overwrite()"
+                            "</color>")
+        self.logger.info("Testing <color>write_file()</color> when a file "
+                         "must not be overwritten...")
+        text = "Hello World!\n"
+        filepath = os.path.join(self.sandbox_tmpdir, "file.txt")
+        write_file(filepath, text)
+        with self.assertRaises(FileExistsError) as cm:
+            write_file(filepath, "Goodbye World!\n", overwrite_file=False)
+        msg = "The file was overwritten"
+        self.assertEqual(read_file(filepath), text, msg)
+        msg = "The FileExistsError exception should not be chained"
+        self.assertTrue(cm.exception.__suppress_context__, msg)
+        # A directory is reported as such, like when overwriting is allowed
+        with self.assertRaises(IsADirectoryError):
+            write_file(self.sandbox_tmpdir, text, overwrite_file=False)
+        self.logger.info("<color>Raised a FileExistsError exception as "
+                         "expected:</color> {}".format(
+                          get_error_msg(cm.exception)))
+
     def create_text_files(self, dirpath, text="Hello World!\n", number_files=2):
         """Create text files in a directory.
 
@@ -707,8 +901,6 @@ class TestFunctions(TestBase):
                 number_files=number_files)
         return maintest_dirpath
 
-    # TODO: test write_file with overwrite=False
-
 
 if __name__ == '__main__':
     unittest.main()
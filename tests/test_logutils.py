@@ -4,7 +4,6 @@ Every functions in :mod:`~pyutils.logutils` are tested here.
 
 """
 
-from copy import deepcopy
 import logging
 import unittest
 
@@ -12,9 +11,67 @@ from .utils import TestBase
 from pyutils.logutils import get_error_msg, setup_logging_from_cfg
 
 
+class _CaptureHandler(logging.Handler):
+    """Handler that keeps the log records it is given instead of emitting them.
+
+    It is a lighter alternative to :meth:`unittest.TestCase.assertLogs` when
+    only the records of a single logging call need to be checked.
+
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.setFormatter(
+            logging.Formatter('%(levelname)s:%(name)s:%(message)s'))
+
+    def emit(self, record):
+        self.records.append(record)
+
+
 class TestFunctions(TestBase):
     # TODO
     test_module_name = "logutils"
+    # Exception given to get_error_msg() and the error message expected from it
+    _exc_fixture = IOError("The file doesn't exist")
+    _expected_get_error_msg = "[OSError] The file doesn't exist"
+
+    @classmethod
+    def setUpClass(cls):
+        """Setup the tests and cache what is shared by all of them.
+        """
+        super().setUpClass()
+        # Logger that is setup by the logging config files/dicts
+        cls._scraper_logger = logging.getLogger('scripts.scraper')
+        # Whether INFO messages are logged. If not, the messages don't need to
+        # be built.
+        cls._info_enabled = cls.logger.isEnabledFor(logging.INFO)
+        # Handler that captures the records logged by the scraper logger
+        cls._capture_handler = _CaptureHandler()
+        # Logging config dict with a corrupted handler's class
+        # NOTE: it can be reused since setup_logging_from_cfg() doesn't modify
+        # the logging config dict it is given
+        cls._corrupted_cfg = cls.with_handler_class('console',
+                                                    'bad.handler.class')
+
+    @classmethod
+    def tearDown(cls):
+        """Cleanup after each test and remove the handlers added to the
+        scraper logger.
+
+        The handlers set up by a test are removed so that they don't accumulate
+        from one test to another.
+
+        Notes
+        -----
+        The scraper logger itself is kept in :mod:`logging`'s registry since it
+        is cached in :meth:`setUpClass`.
+
+        """
+        super().tearDown()
+        for handler in cls._scraper_logger.handlers[:]:
+            cls._scraper_logger.removeHandler(handler)
+            handler.close()
 
     # @unittest.skip("test_get_error_msg()")
     def test_get_error_msg(self):
@@ -26,14 +83,15 @@ class TestFunctions(TestBase):
         """
         self.logger.warning("\n<color>test_get_error_msg()</color>")
         self.logger.info("Testing <color>get_error_msg()</color>...")
-        exc = IOError("The file doesn't exist")
-        error_msg = get_error_msg(exc)
-        expected = "[OSError] The file doesn't exist"
-        msg = "The error message '{}' is different from the expected one " \
-              "'{}'".format(error_msg, expected)
-        self.assertTrue(error_msg == expected, msg)
-        self.logger.info("<color>The error message is the expected one:</color> "
-                         "{}".format(error_msg))
+        error_msg = get_error_msg(self._exc_fixture)
+        # NOTE: the failure message is only built if the test fails
+        if error_msg != self._expected_get_error_msg:
+            self.fail("The error message '{}' is different from the expected "
+                      "one '{}'".format(error_msg,
+                                        self._expected_get_error_msg))
+        if self._info_enabled:
+            self.logger.info("<color>The error message is the expected one:"
+                             "</color> %s", error_msg)
 
     # @unittest.skip("test_setup_logging_case_1()")
     def test_setup_logging_case_1(self):
@@ -73,8 +131,9 @@ class TestFunctions(TestBase):
                          "when a config file doesn't exist...")
         with self.assertRaises(OSError) as cm:
             setup_logging_from_cfg("bad_logging_config.yaml")
-        self.logger.info("<color>Raised an OSError exception as expected:"
-                         "</color> {}".format(get_error_msg(cm.exception)))
+        if self._info_enabled:
+            self.logger.info("<color>Raised an OSError exception as expected:"
+                             "</color> %s", get_error_msg(cm.exception))
 
     # @unittest.skip("test_setup_logging_case_4()")
     def test_setup_logging_case_4(self):
@@ -89,16 +148,13 @@ class TestFunctions(TestBase):
         self.logger.warning("\n\n<color>test_setup_logging_case_4()</color>")
         self.logger.info("Testing <color>case 4 of setup_logging()</color> "
                          "with an invalid config dict...")
-        # Corrupt a logging handler's class
-        # NOTE: if I use copy instead of deepcopy, logging_cfg will also
-        # reflect the corrupted handler's class
-        corrupted_cfg = deepcopy(self.logging_cfg_dict)
-        corrupted_cfg['handlers']['console']['class'] = 'bad.handler.class'
-        # Setup logging with the corrupted config dict
+        # Setup logging with the config dict whose console handler's class is
+        # corrupted
         with self.assertRaises(ValueError) as cm:
-            setup_logging_from_cfg(corrupted_cfg)
-        self.logger.info("<color>Raised a ValueError exception as expected:"
-                         "</color> {}".format(get_error_msg(cm.exception)))
+            setup_logging_from_cfg(self._corrupted_cfg)
+        if self._info_enabled:
+            self.logger.info("<color>Raised a ValueError exception as expected:"
+                             "</color> %s", get_error_msg(cm.exception))
 
     # @unittest.skip("test_setup_logging_case_5()")
     def test_setup_logging_case_5(self):
@@ -114,18 +170,19 @@ class TestFunctions(TestBase):
         self.logger.warning("\n\n<color>test_setup_logging_case_5()</color>")
         self.logger.info("Testing <color>case 5 of setup_logging()</color>...")
         # Remove a key from the logging config dict
-        corrupted_cfg = deepcopy(self.logging_cfg_dict)
         expected_missing_key = 'handlers'
-        del corrupted_cfg[expected_missing_key]
+        corrupted_cfg = self.without_key(expected_missing_key)
         # Setup logging with the corrupted config dict
         with self.assertRaises(KeyError) as cm:
             setup_logging_from_cfg(corrupted_cfg)
-        missing_key = cm.exception.args[0]
-        msg = "The actual missing key ('{}') is not the expected one " \
-              "('{}')".format(missing_key, expected_missing_key)
-        self.assertTrue(expected_missing_key == missing_key, msg)
-        self.logger.info("<color>Raised a KeyError exception as expected:"
-                         "</color> {}".format(get_error_msg(cm.exception)))
+        # NOTE: the failure message is only built if the test fails
+        if cm.exception.args[0] != expected_missing_key:
+            self.fail("The actual missing key ('{}') is not the expected one "
+                      "('{}')".format(cm.exception.args[0],
+                                      expected_missing_key))
+        if self._info_enabled:
+            self.logger.info("<color>Raised a KeyError exception as expected:"
+                             "</color> %s", get_error_msg(cm.exception))
 
     def setup_logging_for_testing(self, logging_cfg):
         """Setup logging for testing from a logging config file or dict.
@@ -143,24 +200,42 @@ class TestFunctions(TestBase):
         :meth:`test_setup_logging_case_2`.
 
         """
-        # NOTE: if I put the next line in the context manager, it will complain
-        # that the expected log was not triggered on 'scripts.scraper'
+        # NOTE: the capture handler must be added after logging is setup since
+        # dictConfig() removes the handlers of the loggers it configures
         ret_cfg_dict = setup_logging_from_cfg(logging_cfg)
-        logger = logging.getLogger('scripts.scraper')
-        with self.assertLogs(logger, 'INFO') as cm:
+        logger = self._scraper_logger
+        handler = self._capture_handler
+        handler.records.clear()
+        # Only the capture handler receives the log record
+        # NOTE: like assertLogs(), the logger's level is set to INFO and its
+        # log records are not propagated while capturing, whatever the logging
+        # config sets
+        old_handlers = logger.handlers
+        old_level = logger.level
+        old_propagate = logger.propagate
+        logger.handlers = [handler]
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
             logger.info('first message')
+        finally:
+            logger.handlers = old_handlers
+            logger.setLevel(old_level)
+            logger.propagate = old_propagate
         msg = "Log emitted not as expected"
-        self.assertEqual(cm.output[0],
+        self.assertEqual(len(handler.records), 1, msg)
+        self.assertEqual(handler.format(handler.records[0]),
                          'INFO:scripts.scraper:first message',
                          msg)
         self.logger.info("<color>Log emitted as expected</color>")
         msg = "The returned logging config dict doesn't have the expected keys"
-        self.assertSequenceEqual(list(ret_cfg_dict.keys()),
-                                 list(self.logging_cfg_dict),
-                                 msg)
-        how = "dict" if isinstance(logging_cfg, dict) else "file"
-        self.logger.info("Successfully setup logging with the logging config "
-                         "{}!".format(how))
+        # NOTE: dict keys views are compared like sets, i.e. without building
+        # any list or set
+        self.assertEqual(ret_cfg_dict.keys(), self.logging_cfg_dict.keys(), msg)
+        if self._info_enabled:
+            how = "dict" if isinstance(logging_cfg, dict) else "file"
+            self.logger.info("Successfully setup logging with the logging "
+                             "config %s!", how)
 
 
 if __name__ == '__main__':
@@ -33,6 +33,9 @@ class TestBase(unittest.TestCase):
     log_filepath = None
     ini_logging_cfg_path = "tests/data/logging.ini"
     yaml_logging_cfg_path = "tests/data/logging.yaml"
+    # IMPORTANT: logging_cfg_dict is a template shared by all the tests and
+    # must not be modified. Use with_handler_class() and without_key() to get
+    # modified versions of it.
     logging_cfg_dict = logging_cfg_dict
 
     @classmethod
@@ -137,6 +140,50 @@ class TestBase(unittest.TestCase):
         # for performing the tests
         cls.data_tmpdir = create_dir(os.path.join(cls._main_tmpdir, "data"))
 
+    @classmethod
+    def with_handler_class(cls, handler_name, new_class):
+        """Get the logging config dict with a handler's class replaced.
+
+        Only the dicts leading to the handler's class are copied, the rest is
+        shared with :attr:`logging_cfg_dict` which is left untouched.
+
+        Parameters
+        ----------
+        handler_name : str
+            Name of the handler whose class is replaced, e.g. 'console'.
+        new_class : str
+            The new handler's class.
+
+        Returns
+        -------
+        dict
+            The logging config dict with the handler's class replaced.
+
+        """
+        base = cls.logging_cfg_dict
+        handler = dict(base['handlers'][handler_name])
+        handler['class'] = new_class
+        handlers = dict(base['handlers'])
+        handlers[handler_name] = handler
+        return dict(base, handlers=handlers)
+
+    @classmethod
+    def without_key(cls, key):
+        """Get the logging config dict without one of its top-level keys.
+
+        Parameters
+        ----------
+        key : str
+            The top-level key to be removed, e.g. 'handlers'.
+
+        Returns
+        -------
+        dict
+            The logging config dict without the given key.
+
+        """
+        return {k: v for k, v in cls.logging_cfg_dict.items() if k != key}
+
     def assert_logs(self, logger, level, str_to_find, fnc, *args, **kwargs):
         """TODO
 